@@ -10,14 +10,31 @@ Date: 2024
 """
 
 import json
+import math
 import os
 import re
 import logging
 import argparse
-from dataclasses import dataclass, field, asdict
+import asyncio
+import io
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass, field
 from typing import Optional
 from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import accumulate, compress, repeat
+from operator import attrgetter, itemgetter
 from datetime import datetime
+from functools import cached_property, lru_cache
+
+try:
+    import orjson  # Optional: faster JSON parsing and serialization
+except ImportError:
+    orjson = None
 
 # Configure logging
 logging.basicConfig(
@@ -31,24 +48,37 @@ logger = logging.getLogger(__name__)
 # DATA CLASSES
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class SecondaryIntent:
     """Represents a secondary intent within a primary category."""
     id: str
     name: str
     description: str
+    
+    def to_dict(self) -> dict:
+        """Plain-dict form, equivalent to dataclasses.asdict."""
+        return {'id': self.id, 'name': self.name, 'description': self.description}
 
 
-@dataclass
+@dataclass(slots=True)
 class PrimaryIntent:
     """Represents a primary intent with its secondary intents."""
     id: str
     name: str
     description: str
     secondary_intents: list[SecondaryIntent] = field(default_factory=list)
+    
+    def to_dict(self) -> dict:
+        """Plain-dict form, equivalent to dataclasses.asdict."""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'description': self.description,
+            'secondary_intents': [secondary.to_dict() for secondary in self.secondary_intents]
+        }
 
 
-@dataclass
+@dataclass(slots=True)
 class CustomerMessage:
     """Represents a customer message with conversation context."""
     id: int
@@ -56,7 +86,7 @@ class CustomerMessage:
     conversation_history: list[dict] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class ProposedIntent:
     """Represents a proposed new or modified intent."""
     level: str  # 'primary' or 'secondary'
@@ -72,7 +102,7 @@ class ProposedIntent:
     rationale: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class ThemeCluster:
     """Represents a cluster of messages with similar themes."""
     theme: str
@@ -106,6 +136,14 @@ class PipelineConfig:
     # Batch size for LLM processing
     LLM_BATCH_SIZE = 20
     
+    # Minimum batch size before keyword scanning is split across processes
+    PARALLEL_MIN_MESSAGES = 100000
+    
+    # Worker processes for parallel keyword scanning. Parallel scanning is
+    # opt-in: 1 scans in-process, None uses all CPUs. Worker pools fork, so
+    # only enable it when the calling process has no other live threads.
+    MAX_WORKERS = 1
+    
     # Keywords for pattern-based detection
     USAGE_KEYWORDS = [
         'how to use', 'how do i use', 'how should i use', 'how to apply',
@@ -153,9 +191,29 @@ class KeywordAnalyzer:
     This is a fast, deterministic first-pass analysis.
     """
     
+    # Separator used when batch messages are joined into one scan buffer;
+    # keywords never contain it, so no match can span two messages.
+    BATCH_SEPARATOR = '\x00'
+    
+    # Messages shorter than this have their scan results memoized; support
+    # traffic repeats the same short questions far more than long ones
+    SHORT_MESSAGE_LENGTH = 200
+    SHORT_MESSAGE_CACHE_SIZE = 4096
+    
+    # Average message length from which batches are scanned message by
+    # message instead of through one joined buffer
+    LONG_MESSAGE_LENGTH = 500
+    
     def __init__(self, config: PipelineConfig = None):
         self.config = config or PipelineConfig()
         self.theme_patterns = self._build_theme_patterns()
+        self._keyword_automaton, self._keyword_masks, self._theme_keywords = self._compile_matchers(
+            tuple((theme, tuple(keywords)) for theme, keywords in self.theme_patterns.items())
+        )
+        self._keyword_groups = tuple(self._theme_keywords.values())
+        self._bit_to_theme = tuple(self.theme_patterns)
+        self._full_mask = (1 << len(self._bit_to_theme)) - 1
+        self._scan_short_mask = lru_cache(maxsize=self.SHORT_MESSAGE_CACHE_SIZE)(self._scan_mask)
     
     def _build_theme_patterns(self) -> dict[str, list[str]]:
         """Build regex patterns for each theme."""
@@ -168,53 +226,308 @@ class KeywordAnalyzer:
             'pricing_promotions': self.config.PRICING_PROMO_KEYWORDS
         }
     
-    def analyze_message(self, message: str) -> list[str]:
+    @staticmethod
+    def _keyword_trie_pattern(keywords) -> str:
+        """
+        Build a regex alternation matching any of the given keywords.
+        
+        Keywords are folded into a prefix trie so shared prefixes are only
+        tested once, and each branch prefers the longest keyword.
+        """
+        trie: dict = {}
+        for keyword in keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        
+        def to_pattern(node: dict) -> str:
+            branches = [re.escape(char) + to_pattern(child) for char, child in node.items() if char]
+            if not branches:
+                return ''
+            is_terminal = '' in node
+            if len(branches) == 1 and not is_terminal:
+                return branches[0]
+            return '(?:' + '|'.join(branches) + ')' + ('?' if is_terminal else '')
+        
+        return to_pattern(trie) if trie else '(?!)'
+    
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _compile_matchers(
+        theme_keywords: tuple[tuple[str, tuple[str, ...]], ...]
+    ) -> tuple[re.Pattern, dict[str, int], dict[str, tuple[str, ...]]]:
+        """
+        Compile the keyword matchers for a set of theme keyword lists.
+        
+        Compilation is cached on the keywords themselves, so every analyzer
+        sharing a configuration reuses one compiled set of matchers.
+        
+        Returns:
+            Tuple of (all-theme automaton, mapping of keyword to theme
+            bitmask, mapping of theme to its minimal keywords).
+        """
+        theme_keywords = tuple(
+            (theme, KeywordAnalyzer._minimal_keywords(keywords))
+            for theme, keywords in theme_keywords
+        )
+        automaton, keyword_masks = KeywordAnalyzer._build_keyword_automaton(theme_keywords)
+        return automaton, keyword_masks, dict(theme_keywords)
+    
+    @staticmethod
+    def _minimal_keywords(keywords: tuple[str, ...]) -> tuple[str, ...]:
+        """
+        Drop keywords that contain another keyword of the same theme.
+        
+        A message containing 'student discount' always contains 'discount',
+        so only the shorter keyword needs to be searched for.
+        """
+        unique = dict.fromkeys(keywords)
+        return tuple(
+            keyword for keyword in unique
+            if not any(other != keyword and other in keyword for other in unique)
+        )
+    
+    @staticmethod
+    def _build_keyword_automaton(
+        theme_keywords: tuple[tuple[str, tuple[str, ...]], ...]
+    ) -> tuple[re.Pattern, dict[str, int]]:
+        """
+        Compile every theme keyword into a single multi-pattern matcher.
+        
+        A message is scanned once for all themes instead of once per keyword.
+        The keyword trie is wrapped in a lookahead to report the longest
+        keyword at every position; shorter keywords matching at the same
+        position are prefixes of it, so their themes are merged into its
+        output mask. Bit i of a mask stands for the i-th theme.
+        
+        Returns:
+            Tuple of (compiled matcher, mapping of keyword to theme bitmask).
+        """
+        keyword_masks: dict[str, int] = defaultdict(int)
+        for bit, (theme, keywords) in enumerate(theme_keywords):
+            for keyword in keywords:
+                keyword_masks[keyword] |= 1 << bit
+        
+        outputs = {}
+        for keyword in keyword_masks:
+            mask = 0
+            for prefix, prefix_mask in keyword_masks.items():
+                if keyword.startswith(prefix):
+                    mask |= prefix_mask
+            outputs[keyword] = mask
+        pattern = KeywordAnalyzer._keyword_trie_pattern(keyword_masks)
+        return re.compile(f"(?=({pattern}))"), outputs
+    
+    def analyze_message(self, message: str, message_lower: Optional[str] = None) -> list[str]:
         """
         Identify themes present in a single message.
         
+        Args:
+            message: Message text to analyze
+            message_lower: Optional precomputed lowercase form of the message
+        
         Returns:
             List of theme identifiers found in the message.
         """
-        message_lower = message.lower()
-        found_themes = []
+        if message_lower is None:
+            message_lower = message.lower()
+        if len(message_lower) < self.SHORT_MESSAGE_LENGTH:
+            mask = self._scan_short_mask(message_lower)
+        else:
+            # Substring search with early exit beats the automaton on long text
+            mask = self._match_mask(self._keyword_groups, message_lower)
+        
+        # Decode only the set bits, lowest first, to keep theme order
+        themes = []
+        while mask:
+            lowest = mask & -mask
+            themes.append(self._bit_to_theme[lowest.bit_length() - 1])
+            mask ^= lowest
+        return themes
+    
+    def _scan_mask(self, message_lower: str) -> int:
+        """
+        Scan a lowercased message and return the bitmask of matched themes.
+        
+        Bit i is set when the i-th theme of theme_patterns matches. Scanning
+        stops as soon as every theme has been seen. The automaton is used for
+        short messages only; sre tries a branch at every position, which
+        loses to plain substring search on longer text.
+        """
+        keyword_masks = self._keyword_masks
+        full_mask = self._full_mask
+        mask = 0
+        for match in self._keyword_automaton.finditer(message_lower):
+            mask |= keyword_masks[match.group(1)]
+            if mask == full_mask:
+                break
+        return mask
+    
+    @staticmethod
+    def _scan_theme(keywords: tuple[str, ...], buffer: str, starts: list[int]) -> array:
+        """
+        Find the indices of all messages in a joined buffer matching a theme.
+        
+        Each keyword is located with str.find, which uses CPython's fast
+        substring search. After each hit the search resumes at the start of
+        the next message, so the rest of a matching message is skipped.
         
-        for theme, keywords in self.theme_patterns.items():
+        Returns:
+            Compact array of matching message positions, in input order.
+        """
+        count = len(starts)
+        last = count - 1
+        is_hit = bytearray(count)
+        find = buffer.find
+        for keyword in keywords:
+            position = find(keyword)
+            while position != -1:
+                index = bisect_right(starts, position) - 1
+                is_hit[index] = 1
+                if index == last:
+                    break
+                position = find(keyword, starts[index + 1])
+        return array('q', compress(range(count), is_hit))
+    
+    @staticmethod
+    def _match_mask(keyword_groups: tuple[tuple[str, ...], ...], message_lower: str) -> int:
+        """
+        Return the bitmask of keyword groups with a keyword in the message.
+        
+        Bit i is set when any keyword of the i-th group is a substring of the
+        message. Each group stops at its first matching keyword.
+        """
+        mask = 0
+        bit = 1
+        for keywords in keyword_groups:
             for keyword in keywords:
                 if keyword in message_lower:
-                    found_themes.append(theme)
+                    mask |= bit
                     break
+            bit <<= 1
+        return mask
+    
+    @staticmethod
+    def _scan_themes(theme_keywords: dict[str, tuple[str, ...]], lowered: list[str]) -> dict[str, array]:
+        """
+        Scan lowercased messages for every theme.
+        
+        Short messages are joined into one buffer that is searched once per
+        keyword. When messages average LONG_MESSAGE_LENGTH characters or more,
+        each message is tested on its own instead: a theme then stops at its
+        first matching keyword, and that early exit wins on long text. This
+        is a static method so it can run in a worker process.
+        
+        Returns:
+            Mapping of theme to the positions of its matching messages.
+        """
+        if not lowered:
+            return {}
+        
+        if sum(map(len, lowered)) >= KeywordAnalyzer.LONG_MESSAGE_LENGTH * len(lowered):
+            keyword_groups = tuple(theme_keywords.values())
+            masks = [KeywordAnalyzer._match_mask(keyword_groups, text) for text in lowered]
+            theme_hits = {}
+            for bit, theme in enumerate(theme_keywords):
+                flag = 1 << bit
+                hits = array('q', [index for index, mask in enumerate(masks) if mask & flag])
+                if hits:
+                    theme_hits[theme] = hits
+            return theme_hits
+        
+        buffer = KeywordAnalyzer.BATCH_SEPARATOR.join(lowered)
+        starts = list(accumulate((len(text) + 1 for text in lowered[:-1]), initial=0))
+        
+        theme_hits = {}
+        for theme, keywords in theme_keywords.items():
+            hits = KeywordAnalyzer._scan_theme(keywords, buffer, starts)
+            if hits:
+                theme_hits[theme] = hits
+        return theme_hits
+    
+    @staticmethod
+    def _expand_hits(unique_hits: array, inverse: list[int], unique_count: int) -> array:
+        """
+        Map hits on distinct texts back to positions in the original batch.
         
-        return found_themes
+        Returns:
+            Positions of every message whose text is among the hits, in
+            input order.
+        """
+        is_hit = bytearray(unique_count)
+        for index in unique_hits:
+            is_hit[index] = 1
+        return array('q', compress(range(len(inverse)), map(is_hit.__getitem__, inverse)))
+    
+    def _scan_themes_parallel(self, lowered: list[str], workers: int) -> dict[str, array]:
+        """
+        Scan a large batch by splitting it into contiguous chunks that are
+        processed in separate worker processes, then merging the hits.
+        """
+        chunk_size = -(-len(lowered) // workers)
+        offsets = range(0, len(lowered), chunk_size)
+        chunks = [lowered[start:start + chunk_size] for start in offsets]
+        
+        theme_hits: dict[str, array] = {}
+        with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+            results = executor.map(self._scan_themes, repeat(self._theme_keywords), chunks)
+            for offset, chunk_hits in zip(offsets, results):
+                for theme, hits in chunk_hits.items():
+                    merged = theme_hits.setdefault(theme, array('q'))
+                    merged.extend(index + offset for index in hits)
+        return theme_hits
     
     def analyze_batch(self, messages: list[CustomerMessage]) -> dict[str, ThemeCluster]:
         """
         Analyze a batch of messages and return theme clusters.
         
+        Each distinct message text is lowercased and scanned only once, and
+        repeated messages share its result. Short texts are joined into one
+        buffer that is searched once per keyword; long ones are tested one by
+        one (see _scan_themes). When MAX_WORKERS allows more than one worker,
+        batches of at least PARALLEL_MIN_MESSAGES distinct texts are scanned
+        across worker processes. Each theme only keeps the positions of its
+        messages; ids are gathered from a shared column and samples are read
+        from the input messages when the cluster is built.
+        
         Returns:
             Dictionary mapping theme names to ThemeCluster objects.
         """
-        theme_messages: dict[str, list] = defaultdict(list)
+        ids = [msg.id for msg in messages]
+        
+        # Lowercase and scan each distinct text once; repeated messages
+        # share its result
+        unique_index: dict[str, int] = {}
+        inverse = [unique_index.setdefault(msg.current_message, len(unique_index)) for msg in messages]
+        unique = [text.lower() for text in unique_index]
         
-        for msg in messages:
-            themes = self.analyze_message(msg.current_message)
-            for theme in themes:
-                theme_messages[theme].append({
-                    'id': msg.id,
-                    'message': msg.current_message
-                })
+        workers = self.config.MAX_WORKERS or os.cpu_count() or 1
+        if workers > 1 and unique and len(unique) >= self.config.PARALLEL_MIN_MESSAGES:
+            theme_hits = self._scan_themes_parallel(unique, workers)
+        else:
+            theme_hits = self._scan_themes(self._theme_keywords, unique)
+        
+        if len(unique) < len(messages):
+            theme_hits = {
+                theme: self._expand_hits(hits, inverse, len(unique))
+                for theme, hits in theme_hits.items()
+            }
         
         total_messages = len(messages)
         clusters = {}
         
-        for theme, msgs in theme_messages.items():
-            count = len(msgs)
+        # Order clusters by first occurrence, as a per-message scan would
+        for theme in sorted(theme_hits, key=lambda t: theme_hits[t][0]):
+            hits = theme_hits[theme]
+            count = len(hits)
             percentage = (count / total_messages) * 100 if total_messages > 0 else 0
             
             clusters[theme] = ThemeCluster(
                 theme=theme,
                 keywords=self.theme_patterns.get(theme, []),
-                message_ids=[m['id'] for m in msgs],
-                message_samples=[m['message'] for m in msgs[:5]],  # Keep top 5 samples
+                message_ids=[ids[i] for i in hits],
+                message_samples=[messages[i].current_message for i in hits[:5]],  # Keep top 5 samples
                 count=count,
                 percentage=percentage
             )
@@ -229,6 +542,24 @@ class KeywordAnalyzer:
 class IntentHierarchyManager:
     """Manages the current intent hierarchy and proposes modifications."""
     
+    THEME_TO_PARENT = {
+        'product_usage': 'about_product',
+        'certification_compliance': 'about_product',
+        'safety_suitability': 'about_product',
+        'ingredient_composition': 'about_product',
+        'return_exchange': 'order_management',
+        'pricing_promotions': 'payment'
+    }
+    
+    THEME_OVERLAPS = {
+        'product_usage': ['product_info'],
+        'certification_compliance': ['product_info'],
+        'safety_suitability': ['product_info'],
+        'ingredient_composition': ['product_info'],
+        'return_exchange': ['order_cancellation', 'order_modification'],
+        'pricing_promotions': ['payment_methods']
+    }
+    
     def __init__(self, intent_mapper: dict):
         self.primary_intents: list[PrimaryIntent] = []
         self._load_hierarchy(intent_mapper)
@@ -260,38 +591,27 @@ class IntentHierarchyManager:
                 secondary_intents=secondary_intents
             ))
     
-    def get_all_intent_ids(self) -> set[str]:
+    @cached_property
+    def all_intent_ids(self) -> frozenset[str]:
+        """All existing intent IDs (primary and secondary), computed once."""
+        primary_ids = frozenset(primary.id for primary in self.primary_intents)
+        return primary_ids.union(
+            secondary.id
+            for primary in self.primary_intents
+            for secondary in primary.secondary_intents
+        )
+    
+    def get_all_intent_ids(self) -> frozenset[str]:
         """Get all existing intent IDs (primary and secondary)."""
-        ids = set()
-        for primary in self.primary_intents:
-            ids.add(primary.id)
-            for secondary in primary.secondary_intents:
-                ids.add(secondary.id)
-        return ids
+        return self.all_intent_ids
     
     def find_best_parent(self, theme: str) -> Optional[str]:
         """Find the best parent intent for a given theme."""
-        theme_to_parent = {
-            'product_usage': 'about_product',
-            'certification_compliance': 'about_product',
-            'safety_suitability': 'about_product',
-            'ingredient_composition': 'about_product',
-            'return_exchange': 'order_management',
-            'pricing_promotions': 'payment'
-        }
-        return theme_to_parent.get(theme)
+        return self.THEME_TO_PARENT.get(theme)
     
     def get_similar_intents(self, theme: str) -> list[str]:
         """Get existing intents that might overlap with a theme."""
-        theme_overlaps = {
-            'product_usage': ['product_info'],
-            'certification_compliance': ['product_info'],
-            'safety_suitability': ['product_info'],
-            'ingredient_composition': ['product_info'],
-            'return_exchange': ['order_cancellation', 'order_modification'],
-            'pricing_promotions': ['payment_methods']
-        }
-        return theme_overlaps.get(theme, [])
+        return self.THEME_OVERLAPS.get(theme, [])
 
 
 # =============================================================================
@@ -361,15 +681,15 @@ class IntentProposalGenerator:
         for theme, cluster in sorted_clusters:
             # Apply guardrails
             if cluster.count < self.config.MIN_CLUSTER_SIZE:
-                logger.debug(f"Skipping {theme}: count {cluster.count} < min {self.config.MIN_CLUSTER_SIZE}")
+                logger.debug("Skipping %s: count %s < min %s", theme, cluster.count, self.config.MIN_CLUSTER_SIZE)
                 continue
             
             if cluster.percentage < self.config.MIN_CLUSTER_PERCENTAGE:
-                logger.debug(f"Skipping {theme}: percentage {cluster.percentage:.1f}% < min {self.config.MIN_CLUSTER_PERCENTAGE}%")
+                logger.debug("Skipping %s: percentage %.1f%% < min %s%%", theme, cluster.percentage, self.config.MIN_CLUSTER_PERCENTAGE)
                 continue
             
             if len(proposals) >= self.config.MAX_PROPOSED_INTENTS:
-                logger.warning(f"Reached max proposals ({self.config.MAX_PROPOSED_INTENTS}), stopping")
+                logger.warning("Reached max proposals (%s), stopping", self.config.MAX_PROPOSED_INTENTS)
                 break
             
             # Generate proposal
@@ -410,6 +730,12 @@ class IntentProposalGenerator:
             rationale=definition['rationale']
         )
     
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _count_score(count: int) -> float:
+        """Log-scaled score for a cluster size, saturating at 100 messages."""
+        return min(1.0, math.log10(count + 1) * 0.5)
+    
     def _calculate_confidence(self, cluster: ThemeCluster, similar_intents: list[str]) -> float:
         """
         Calculate confidence score for a proposal.
@@ -420,8 +746,7 @@ class IntentProposalGenerator:
         - Overlap with existing intents (lower overlap = better fit for new intent)
         """
         # Base score from count (log scale to prevent huge clusters from dominating)
-        import math
-        count_score = min(1.0, math.log10(cluster.count + 1) / 2)
+        count_score = self._count_score(cluster.count)
         
         # Percentage score
         percentage_score = min(1.0, cluster.percentage / 10)
@@ -445,19 +770,38 @@ class LLMInterface:
     Supports OpenAI, Anthropic, and Google's Gemini.
     """
     
+    # Shared decoder used to pull the first JSON object out of a response
+    _JSON_DECODER = json.JSONDecoder()
+    
+    # Default number of provider requests allowed in flight at once
+    MAX_CONCURRENT_REQUESTS = 4
+    
+    # Retries after a failed provider request, with exponential backoff
+    # starting at RETRY_BASE_DELAY seconds
+    MAX_RETRIES = 3
+    RETRY_BASE_DELAY = 1.0
+    
+    # Environment variable holding the API key for each provider
+    API_KEY_ENV_VARS = {
+        'openai': 'OPENAI_API_KEY',
+        'anthropic': 'ANTHROPIC_API_KEY',
+        'google': 'GOOGLE_API_KEY'
+    }
+    
     def __init__(self, provider: str = 'openai', api_key: Optional[str] = None):
         self.provider = provider
         self.api_key = api_key or self._get_api_key()
         self._client = None
+        self._client_lock = threading.Lock()
+        self._dispatch = {
+            'openai': self._call_openai,
+            'anthropic': self._call_anthropic,
+            'google': self._call_google
+        }
     
     def _get_api_key(self) -> Optional[str]:
         """Get API key from environment variables."""
-        key_mapping = {
-            'openai': 'OPENAI_API_KEY',
-            'anthropic': 'ANTHROPIC_API_KEY',
-            'google': 'GOOGLE_API_KEY'
-        }
-        env_var = key_mapping.get(self.provider)
+        env_var = self.API_KEY_ENV_VARS.get(self.provider)
         return os.environ.get(env_var) if env_var else None
     
     def is_available(self) -> bool:
@@ -476,18 +820,58 @@ class LLMInterface:
             Dictionary with identified themes and their characteristics.
         """
         if not self.is_available():
-            logger.warning(f"LLM ({self.provider}) not available, skipping LLM analysis")
+            logger.warning("LLM (%s) not available, skipping LLM analysis", self.provider)
             return {}
         
         prompt = self._build_theme_analysis_prompt(messages, existing_intents)
         
         try:
-            response = self._call_llm(prompt)
+            response = self._call_llm_with_retry(prompt)
             return self._parse_theme_response(response)
         except Exception as e:
-            logger.error(f"LLM analysis failed: {e}")
+            logger.error("LLM analysis failed: %s", e)
             return {}
     
+    async def analyze_messages_for_themes_async(
+        self,
+        groups: list[tuple[list[str], list[dict]]],
+        max_concurrency: Optional[int] = None
+    ) -> list[dict]:
+        """
+        Analyze several message groups with overlapping LLM requests.
+        
+        Each group is a (messages, existing_intents) pair handled exactly
+        like analyze_messages_for_themes, retries included. Provider calls
+        run in worker threads so their network round trips overlap, bounded
+        by max_concurrency to respect provider rate limits. This is library
+        API: IntentExpansionPipeline sends a single prompt per run.
+        
+        Returns:
+            One theme dictionary per group, in input order.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or self.MAX_CONCURRENT_REQUESTS)
+        
+        async def analyze(messages: list[str], existing_intents: list[dict]) -> dict:
+            async with semaphore:
+                return await asyncio.to_thread(
+                    self.analyze_messages_for_themes, messages, existing_intents
+                )
+        
+        return list(await asyncio.gather(*(analyze(m, i) for m, i in groups)))
+    
+    def analyze_messages_for_themes_batch(
+        self,
+        groups: list[tuple[list[str], list[dict]]],
+        max_concurrency: Optional[int] = None
+    ) -> list[dict]:
+        """
+        Synchronous wrapper around analyze_messages_for_themes_async.
+        
+        Returns:
+            One theme dictionary per group, in input order.
+        """
+        return asyncio.run(self.analyze_messages_for_themes_async(groups, max_concurrency))
+    
     def _build_theme_analysis_prompt(
         self,
         messages: list[str],
@@ -527,22 +911,52 @@ Respond in JSON format:
     ]
 }}"""
     
+    def _call_llm_with_retry(self, prompt: str) -> str:
+        """
+        Call the LLM API, retrying failed requests with exponential backoff.
+        
+        Up to MAX_RETRIES retries are made, waiting RETRY_BASE_DELAY seconds
+        before the first and doubling each time. Configuration errors
+        (ValueError) are raised at once; the last failure is re-raised.
+        """
+        for attempt in range(self.MAX_RETRIES + 1):
+            try:
+                return self._call_llm(prompt)
+            except ValueError:
+                raise
+            except Exception as e:
+                if attempt == self.MAX_RETRIES:
+                    raise
+                delay = self.RETRY_BASE_DELAY * 2 ** attempt
+                logger.warning("LLM request failed (%s), retrying in %.1fs", e, delay)
+                time.sleep(delay)
+    
     def _call_llm(self, prompt: str) -> str:
         """Call the LLM API."""
-        if self.provider == 'openai':
-            return self._call_openai(prompt)
-        elif self.provider == 'anthropic':
-            return self._call_anthropic(prompt)
-        elif self.provider == 'google':
-            return self._call_google(prompt)
-        else:
+        call = self._dispatch.get(self.provider)
+        if call is None:
             raise ValueError(f"Unknown provider: {self.provider}")
+        return call(prompt)
+    
+    def _get_client(self, factory):
+        """
+        Return the provider client, creating it with factory on first use.
+        
+        The client is kept for the lifetime of this interface so its HTTP
+        connection pool is reused across prompts, including prompts sent
+        concurrently from worker threads.
+        """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = factory()
+        return self._client
     
     def _call_openai(self, prompt: str) -> str:
         """Call OpenAI API."""
         try:
             from openai import OpenAI
-            client = OpenAI(api_key=self.api_key)
+            client = self._get_client(lambda: OpenAI(api_key=self.api_key))
             response = client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
@@ -561,7 +975,7 @@ Respond in JSON format:
         """Call Anthropic API."""
         try:
             from anthropic import Anthropic
-            client = Anthropic(api_key=self.api_key)
+            client = self._get_client(lambda: Anthropic(api_key=self.api_key))
             response = client.messages.create(
                 model="claude-3-haiku-20240307",
                 max_tokens=2000,
@@ -578,8 +992,12 @@ Respond in JSON format:
         """Call Google Gemini API."""
         try:
             import google.generativeai as genai
-            genai.configure(api_key=self.api_key)
-            model = genai.GenerativeModel('gemini-2.0-flash-exp')
+            
+            def create_model():
+                genai.configure(api_key=self.api_key)
+                return genai.GenerativeModel('gemini-2.0-flash-exp')
+            
+            model = self._get_client(create_model)
             response = model.generate_content(prompt)
             return response.text
         except ImportError:
@@ -587,12 +1005,34 @@ Respond in JSON format:
             return ""
     
     def _parse_theme_response(self, response: str) -> dict:
-        """Parse LLM response to extract themes."""
+        """
+        Parse LLM response to extract themes.
+        
+        When orjson is installed the outermost brace-delimited block is tried
+        with it first, which covers the usual reply that is all JSON.
+        Otherwise the first JSON object in the response is decoded in a single
+        linear pass, so prose or stray braces after it are ignored. If that
+        fails, the outermost block is tried as a whole.
+        """
+        start = response.find('{')
+        if start == -1:
+            return {}
+        end = response.rfind('}')
+        
+        if orjson is not None and end > start:
+            try:
+                return orjson.loads(response[start:end + 1])
+            except orjson.JSONDecodeError:
+                pass
+        
+        try:
+            return self._JSON_DECODER.raw_decode(response, start)[0]
+        except json.JSONDecodeError:
+            pass
+        
         try:
-            # Try to extract JSON from response
-            json_match = re.search(r'\{[\s\S]*\}', response)
-            if json_match:
-                return json.loads(json_match.group())
+            if end > start:
+                return json.loads(response[start:end + 1])
         except json.JSONDecodeError:
             logger.warning("Failed to parse LLM response as JSON")
         return {}
@@ -607,6 +1047,9 @@ class GuardrailChecker:
     Implements guardrails to prevent problematic intent proposals.
     """
     
+    # Name fragments that suggest a catch-all intent
+    CONFUSING_PATTERNS = ('other', 'misc', 'general', 'various')
+    
     def __init__(self, config: PipelineConfig = None):
         self.config = config or PipelineConfig()
     
@@ -632,13 +1075,23 @@ class GuardrailChecker:
             issues.append(f"Low confidence score ({proposal.confidence_score})")
         
         # Check for potentially confusing names
-        confusing_patterns = ['other', 'misc', 'general', 'various']
-        if any(p in proposal.name.lower() for p in confusing_patterns):
+        name_lower = proposal.name.lower()
+        if any(p in name_lower for p in self.CONFUSING_PATTERNS):
             issues.append("Name may be too generic - could confuse classification")
         
         is_valid = len(issues) == 0 or all('warning' in i.lower() for i in issues)
         return is_valid, issues
     
+    def validate_proposals(self, proposals: list[ProposedIntent]) -> list[tuple[bool, list[str]]]:
+        """
+        Validate each proposal independently against guardrails.
+        
+        Returns:
+            One (is_valid, issues) tuple per proposal, in input order.
+        """
+        validate = self.validate_proposal
+        return [validate(proposal) for proposal in proposals]
+    
     def check_fragmentation_risk(self, proposals: list[ProposedIntent]) -> list[str]:
         """
         Check if proposals collectively risk fragmenting the intent space too much.
@@ -657,17 +1110,27 @@ class GuardrailChecker:
         
         # Check for similar proposals that might overlap
         names = [p.name.lower() for p in proposals]
-        for i, name1 in enumerate(names):
-            for name2 in names[i+1:]:
-                # Simple word overlap check
-                words1 = set(name1.split())
-                words2 = set(name2.split())
-                overlap = words1 & words2
-                if len(overlap) > 1:
-                    warnings.append(
-                        f"Potential overlap between '{name1}' and '{name2}' "
-                        f"(common words: {overlap})"
-                    )
+        word_sets = [set(name.split()) for name in names]
+        
+        # Index proposals by word so only pairs sharing a word are compared
+        word_index: dict[str, list[int]] = defaultdict(list)
+        for i, words in enumerate(word_sets):
+            for word in words:
+                word_index[word].append(i)
+        
+        shared_counts: Counter = Counter()
+        for indices in word_index.values():
+            for k, i in enumerate(indices):
+                for j in indices[k+1:]:
+                    shared_counts[(i, j)] += 1
+        
+        for i, j in sorted(pair for pair, count in shared_counts.items() if count > 1):
+            # Simple word overlap check
+            overlap = word_sets[i] & word_sets[j]
+            warnings.append(
+                f"Potential overlap between '{names[i]}' and '{names[j]}' "
+                f"(common words: {overlap})"
+            )
         
         return warnings
 
@@ -679,6 +1142,72 @@ class GuardrailChecker:
 class ReportGenerator:
     """Generates the final analysis report."""
     
+    # Markdown written when a run finds no themes and no proposals
+    MD_EMPTY_REPORT = (
+        "# Intent Expansion Analysis Report\n"
+        "\n"
+        "_No themes or proposals found._\n"
+    )
+    
+    # Markdown layout, filled in with str.format_map when rendering
+    MD_HEADER_TEMPLATE = (
+        "# Intent Expansion Analysis Report\n"
+        "\n"
+        "**Generated:** {generated_at}\n"
+        "**Messages Analyzed:** {total_messages_analyzed}\n"
+        "**Themes Identified:** {themes_identified}\n"
+        "**Proposals Generated:** {proposals_generated}\n"
+        "\n"
+        "---\n"
+        "\n"
+        "## Theme Analysis\n"
+    )
+    MD_THEME_TEMPLATE = (
+        "\n### {title}\n"
+        "- **Count:** {count} messages ({percentage}%)\n"
+        "- **Keywords:** {keywords}\n"
+        "- **Samples:**\n"
+    )
+    MD_PROPOSALS_HEADING = (
+        "\n"
+        "---\n"
+        "\n"
+        "## Proposed Intents\n"
+    )
+    _MD_PROPOSAL_HEAD = (
+        "\n### {name}\n"
+        "\n"
+        "| Property | Value |\n"
+        "|----------|-------|\n"
+        "| **Level** | {level} |\n"
+        "| **ID** | `{id}` |\n"
+        "| **Parent Intent** | `{parent_intent}` |\n"
+    )
+    _MD_PROPOSAL_TAIL = (
+        "| **Confidence** | {confidence_score} |\n"
+        "| **Evidence Count** | {evidence_count} |\n"
+        "\n"
+        "**Description:** {description}\n"
+        "\n"
+        "**Rationale:** {rationale}\n"
+        "\n"
+        "**Example Messages:**\n"
+    )
+    # Proposal tables, specialised on whether the proposal splits an intent
+    MD_PROPOSAL_TEMPLATE = (
+        _MD_PROPOSAL_HEAD + "| **Action** | {action} |\n" + _MD_PROPOSAL_TAIL
+    )
+    MD_SPLIT_PROPOSAL_TEMPLATE = (
+        _MD_PROPOSAL_HEAD + "| **Action** | {action} from `{original_intent}` |\n" + _MD_PROPOSAL_TAIL
+    )
+    MD_WARNINGS_HEADING = (
+        "\n"
+        "---\n"
+        "\n"
+        "## Guardrail Warnings\n"
+        "\n"
+    )
+    
     def __init__(self, config: PipelineConfig = None):
         self.config = config or PipelineConfig()
     
@@ -687,122 +1216,139 @@ class ReportGenerator:
         proposals: list[ProposedIntent],
         clusters: dict[str, ThemeCluster],
         guardrail_warnings: list[str],
-        total_messages: int
+        total_messages: int,
+        llm_themes: Optional[dict] = None
     ) -> dict:
         """Generate comprehensive analysis report."""
-        return {
+        generated_at = datetime.now().isoformat()
+        # Read at report time, so the section states the thresholds this
+        # run applied even if the config was changed after construction
+        config = self.config
+        report = {
             'metadata': {
-                'generated_at': datetime.now().isoformat(),
+                'generated_at': generated_at,
                 'total_messages_analyzed': total_messages,
                 'themes_identified': len(clusters),
                 'proposals_generated': len(proposals)
             },
             'configuration': {
-                'min_cluster_size': self.config.MIN_CLUSTER_SIZE,
-                'min_cluster_percentage': self.config.MIN_CLUSTER_PERCENTAGE,
-                'confidence_threshold': self.config.CONFIDENCE_THRESHOLD,
-                'max_proposed_intents': self.config.MAX_PROPOSED_INTENTS
-            },
-            'theme_analysis': {
-                theme: {
-                    'count': cluster.count,
-                    'percentage': round(cluster.percentage, 2),
-                    'keywords': cluster.keywords[:5],
-                    'sample_messages': cluster.message_samples[:3]
-                }
-                for theme, cluster in clusters.items()
+                'min_cluster_size': config.MIN_CLUSTER_SIZE,
+                'min_cluster_percentage': config.MIN_CLUSTER_PERCENTAGE,
+                'confidence_threshold': config.CONFIDENCE_THRESHOLD,
+                'max_proposed_intents': config.MAX_PROPOSED_INTENTS
             },
-            'proposed_intents': [
-                {
-                    'level': p.level,
-                    'parent_intent': p.parent_intent_id,
-                    'name': p.name,
-                    'id': p.id,
-                    'description': p.description,
-                    'action': p.action,
-                    'original_intent': p.original_intent_id,
-                    'evidence_count': p.evidence_count,
-                    'confidence_score': p.confidence_score,
-                    'rationale': p.rationale,
-                    'example_messages': p.evidence_messages[:3]
-                }
-                for p in proposals
-            ],
+            'theme_analysis': dict(self.iter_theme_records(clusters)),
+            'proposed_intents': list(self.iter_proposal_records(proposals)),
             'guardrails': {
                 'warnings': guardrail_warnings,
                 'status': 'passed' if not guardrail_warnings else 'review_needed'
             }
         }
+        if llm_themes:
+            report['llm_analysis'] = llm_themes
+        return report
+    
+    @staticmethod
+    def _head(items: list, n: int) -> list:
+        """First n items, reusing the list itself when it is already short enough."""
+        return items if len(items) <= n else items[:n]
+    
+    def iter_theme_records(self, clusters: dict[str, ThemeCluster]):
+        """Yield (theme, record) pairs for the report's theme analysis section."""
+        head = self._head
+        for theme, cluster in clusters.items():
+            yield theme, {
+                'count': cluster.count,
+                'percentage': round(cluster.percentage, 2),
+                'keywords': head(cluster.keywords, 5),
+                'sample_messages': head(cluster.message_samples, 3)
+            }
+    
+    def iter_proposal_records(self, proposals: list[ProposedIntent]):
+        """Yield one report record per proposal, in order."""
+        head = self._head
+        for p in proposals:
+            yield {
+                'level': p.level,
+                'parent_intent': p.parent_intent_id,
+                'name': p.name,
+                'id': p.id,
+                'description': p.description,
+                'action': p.action,
+                'original_intent': p.original_intent_id,
+                'evidence_count': p.evidence_count,
+                'confidence_score': p.confidence_score,
+                'rationale': p.rationale,
+                'example_messages': head(p.evidence_messages, 3)
+            }
+    
+    def to_json(self, report: dict) -> bytes:
+        """
+        Serialize the report as indented UTF-8 JSON.
+        
+        Uses orjson when installed, falling back to the standard library,
+        also for reports orjson cannot encode (lone surrogates in text,
+        integers wider than 64 bits).
+        """
+        if orjson is not None:
+            try:
+                return orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+            except orjson.JSONEncodeError:
+                pass
+        return json.dumps(report, indent=2).encode('utf-8')
     
     def format_as_markdown(self, report: dict) -> str:
         """Format the report as Markdown for documentation."""
-        md_lines = [
-            "# Intent Expansion Analysis Report",
-            "",
-            f"**Generated:** {report['metadata']['generated_at']}",
-            f"**Messages Analyzed:** {report['metadata']['total_messages_analyzed']}",
-            f"**Themes Identified:** {report['metadata']['themes_identified']}",
-            f"**Proposals Generated:** {report['metadata']['proposals_generated']}",
-            "",
-            "---",
-            "",
-            "## Theme Analysis",
-            ""
-        ]
+        buf = io.StringIO()
+        self.format_as_markdown_to(report, buf)
+        return buf.getvalue()
+    
+    def format_as_markdown_to(self, report: dict, fp) -> None:
+        """
+        Write the report as Markdown to a text file object.
+        
+        The document is streamed piece by piece through fp.write, so it is
+        never held in memory as one string. Each section starts with the
+        blank line that separates it from the previous one, so no trailing
+        separator has to be removed at the end.
+        """
+        write = fp.write
+        
+        write(self.MD_HEADER_TEMPLATE.format_map(report['metadata']))
         
+        theme_template = self.MD_THEME_TEMPLATE
         for theme, data in report['theme_analysis'].items():
-            md_lines.extend([
-                f"### {theme.replace('_', ' ').title()}",
-                f"- **Count:** {data['count']} messages ({data['percentage']}%)",
-                f"- **Keywords:** {', '.join(data['keywords'])}",
-                f"- **Samples:**"
-            ])
+            write(theme_template.format(
+                title=theme.replace('_', ' ').title(),
+                count=data['count'],
+                percentage=data['percentage'],
+                keywords=', '.join(data['keywords'])
+            ))
             for sample in data['sample_messages']:
-                md_lines.append(f"  - \"{sample}\"")
-            md_lines.append("")
-        
-        md_lines.extend([
-            "---",
-            "",
-            "## Proposed Intents",
-            ""
-        ])
+                write('  - "')
+                write(sample)
+                write('"\n')
+        
+        write(self.MD_PROPOSALS_HEADING)
         
+        proposal_template = self.MD_PROPOSAL_TEMPLATE
+        split_template = self.MD_SPLIT_PROPOSAL_TEMPLATE
         for proposal in report['proposed_intents']:
-            md_lines.extend([
-                f"### {proposal['name']}",
-                "",
-                f"| Property | Value |",
-                f"|----------|-------|",
-                f"| **Level** | {proposal['level']} |",
-                f"| **ID** | `{proposal['id']}` |",
-                f"| **Parent Intent** | `{proposal['parent_intent']}` |",
-                f"| **Action** | {proposal['action']} from `{proposal['original_intent']}` |" if proposal['original_intent'] else f"| **Action** | {proposal['action']} |",
-                f"| **Confidence** | {proposal['confidence_score']} |",
-                f"| **Evidence Count** | {proposal['evidence_count']} |",
-                "",
-                f"**Description:** {proposal['description']}",
-                "",
-                f"**Rationale:** {proposal['rationale']}",
-                "",
-                "**Example Messages:**"
-            ])
+            if proposal['original_intent']:
+                write(split_template.format_map(proposal))
+            else:
+                write(proposal_template.format_map(proposal))
             for example in proposal['example_messages']:
-                md_lines.append(f"- \"{example}\"")
-            md_lines.append("")
+                write('- "')
+                write(example)
+                write('"\n')
         
         if report['guardrails']['warnings']:
-            md_lines.extend([
-                "---",
-                "",
-                "## Guardrail Warnings",
-                ""
-            ])
+            write(self.MD_WARNINGS_HEADING)
             for warning in report['guardrails']['warnings']:
-                md_lines.append(f"⚠️ {warning}")
-            md_lines.append("")
-        
-        return "\n".join(md_lines)
+                write("⚠️ ")
+                write(warning)
+                write("\n")
 
 
 # =============================================================================
@@ -822,6 +1368,9 @@ class IntentExpansionPipeline:
     6. Generate final report
     """
     
+    # Write buffer size for report files
+    OUTPUT_BUFFER_SIZE = 1 << 20
+    
     def __init__(
         self,
         config: Optional[PipelineConfig] = None,
@@ -841,35 +1390,72 @@ class IntentExpansionPipeline:
     
     def load_data(self, filepath: str) -> tuple[list[CustomerMessage], dict]:
         """Load input data from JSON file."""
-        logger.info(f"Loading data from {filepath}")
+        logger.info("Loading data from %s", filepath)
         
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # Parsed with the standard library: orjson rejects lone surrogates
+        # in message text and turns integers wider than 64 bits into floats
+        with open(filepath, 'rb') as f:
+            data = json.loads(f.read())
         
         # Parse customer messages (handle both formats)
-        messages = []
-        for i, msg in enumerate(data.get('customer_messages', [])):
-            # Handle different field names
-            current_msg = msg.get('current_message') or msg.get('current_human_message', '')
-            history = msg.get('conversation_history', [])
-            
-            # If history is a string (old format), convert it to list format
-            if isinstance(history, str) or msg.get('history'):
-                history = []  # For simplicity, we'll just use the current message
-            
-            messages.append(CustomerMessage(
-                id=msg.get('id', i + 1),
-                current_message=current_msg,
-                conversation_history=history
-            ))
+        raw_messages = data.get('customer_messages', ())
+        try:
+            messages = self._parse_clean_messages(raw_messages)
+        except KeyError:
+            messages = [self._parse_message(i, msg) for i, msg in enumerate(raw_messages)]
         
-        logger.info(f"Loaded {len(messages)} customer messages")
+        logger.info("Loaded %d customer messages", len(messages))
         
         # Extract intent_mapper
         intent_mapper = data.get('intent_mapper', {})
         
         return messages, intent_mapper
     
+    @staticmethod
+    def _parse_message(i: int, msg: dict) -> CustomerMessage:
+        """Build a CustomerMessage from any supported row format."""
+        # Handle different field names
+        current_msg = msg.get('current_message') or msg.get('current_human_message', '')
+        history = msg.get('conversation_history', [])
+        
+        # If history is a string (old format), convert it to list format
+        if isinstance(history, str) or msg.get('history'):
+            history = []  # For simplicity, we'll just use the current message
+        
+        return CustomerMessage(msg.get('id', i + 1), current_msg, history)
+    
+    @classmethod
+    def _parse_clean_messages(cls, raw_messages) -> list[CustomerMessage]:
+        """
+        Fast path for rows that all carry id, current_message and
+        conversation_history.
+        
+        Fields are read with one itemgetter call per row. Rows that need the
+        general handling (empty current_message, string or legacy history)
+        go through _parse_message. Raises KeyError on the first row missing
+        a field, so the caller can fall back to the general path.
+        """
+        get_fields = itemgetter('id', 'current_message', 'conversation_history')
+        parse_message = cls._parse_message
+        messages = []
+        append = messages.append
+        for i, msg in enumerate(raw_messages):
+            msg_id, current_msg, history = get_fields(msg)
+            if current_msg and not isinstance(history, str) and not msg.get('history'):
+                append(CustomerMessage(msg_id, current_msg, history))
+            else:
+                append(parse_message(i, msg))
+        return messages
+    
+    def _write_markdown(self, report: dict, md_path: str) -> None:
+        """Save the Markdown report, skipping rendering when there are no findings."""
+        with open(md_path, 'w', encoding='utf-8', newline='\n', buffering=self.OUTPUT_BUFFER_SIZE) as f:
+            if report['proposed_intents'] or report['theme_analysis']:
+                self.report_generator.format_as_markdown_to(report, f)
+            else:
+                logger.info("No findings; skipping Markdown rendering")
+                f.write(self.report_generator.MD_EMPTY_REPORT)
+    
     def run(self, input_filepath: str, output_filepath: Optional[str] = None) -> dict:
         """
         Execute the full intent expansion pipeline.
@@ -900,18 +1486,20 @@ class IntentExpansionPipeline:
         # Step 3: Keyword-based analysis
         logger.info("Performing keyword-based theme analysis...")
         clusters = self.keyword_analyzer.analyze_batch(messages)
-        logger.info(f"Identified {len(clusters)} theme clusters")
+        logger.info("Identified %d theme clusters", len(clusters))
         
-        # Step 4: Optional LLM enhancement
+        # Step 4: Optional LLM enhancement, overlapped with proposal generation
+        llm_future = None
         if self.use_llm and self.llm and self.llm.is_available():
             logger.info("Enhancing analysis with LLM...")
-            llm_themes = self.llm.analyze_messages_for_themes(
-                [m.current_message for m in messages[:100]],  # Sample for efficiency
-                [asdict(p) for p in self.hierarchy_manager.primary_intents]
+            llm_executor = ThreadPoolExecutor(max_workers=1)
+            llm_future = llm_executor.submit(
+                self.llm.analyze_messages_for_themes,
+                tuple(map(attrgetter('current_message'), messages[:100])),  # Sample for efficiency
+                [p.to_dict() for p in self.hierarchy_manager.primary_intents]
             )
-            # Merge LLM insights with keyword analysis
-            if llm_themes.get('themes'):
-                logger.info(f"LLM identified {len(llm_themes['themes'])} additional themes")
+            # The worker finishes the submitted call, then exits
+            llm_executor.shutdown(wait=False)
         else:
             if self.use_llm:
                 logger.warning("LLM requested but not available, proceeding with keyword analysis only")
@@ -919,24 +1507,33 @@ class IntentExpansionPipeline:
         # Step 5: Generate proposals
         logger.info("Generating intent proposals...")
         proposals = self.proposal_generator.generate_proposals(clusters)
-        logger.info(f"Generated {len(proposals)} proposals")
+        logger.info("Generated %d proposals", len(proposals))
         
         # Step 6: Apply guardrails
         logger.info("Applying guardrails...")
         all_warnings = []
         
         # Check individual proposals
-        for proposal in proposals:
-            is_valid, issues = self.guardrail_checker.validate_proposal(proposal)
+        results = self.guardrail_checker.validate_proposals(proposals)
+        for proposal, (is_valid, issues) in zip(proposals, results):
             if issues:
-                all_warnings.extend([f"{proposal.name}: {issue}" for issue in issues])
+                prefix = f"{proposal.name}: "
+                all_warnings.extend(prefix + issue for issue in issues)
         
         # Check fragmentation risk
         fragmentation_warnings = self.guardrail_checker.check_fragmentation_risk(proposals)
         all_warnings.extend(fragmentation_warnings)
         
         if all_warnings:
-            logger.warning(f"Guardrail warnings: {len(all_warnings)}")
+            logger.warning("Guardrail warnings: %d", len(all_warnings))
+        
+        # Join the LLM call before reporting
+        llm_themes = None
+        if llm_future is not None:
+            llm_themes = llm_future.result()
+            # Merge LLM insights with keyword analysis
+            if llm_themes.get('themes'):
+                logger.info("LLM identified %d additional themes", len(llm_themes['themes']))
         
         # Step 7: Generate report
         logger.info("Generating report...")
@@ -944,23 +1541,27 @@ class IntentExpansionPipeline:
             proposals=proposals,
             clusters=clusters,
             guardrail_warnings=all_warnings,
-            total_messages=len(messages)
+            total_messages=len(messages),
+            llm_themes=llm_themes
         )
         
         # Step 8: Save output
         if output_filepath:
-            # Save JSON report
             json_path = output_filepath if output_filepath.endswith('.json') else f"{output_filepath}.json"
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(report, f, indent=2)
-            logger.info(f"Saved JSON report to {json_path}")
-            
-            # Save Markdown report
             md_path = output_filepath.replace('.json', '') + '.md'
-            md_content = self.report_generator.format_as_markdown(report)
-            with open(md_path, 'w', encoding='utf-8') as f:
-                f.write(md_content)
-            logger.info(f"Saved Markdown report to {md_path}")
+            
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                # Stream the Markdown report to disk while the JSON report is written
+                md_future = executor.submit(self._write_markdown, report, md_path)
+                
+                # Save JSON report, serialized before the file is opened
+                json_content = self.report_generator.to_json(report)
+                with open(json_path, 'wb', buffering=self.OUTPUT_BUFFER_SIZE) as f:
+                    f.write(json_content)
+                logger.info("Saved JSON report to %s", json_path)
+                
+                md_future.result()
+            logger.info("Saved Markdown report to %s", md_path)
         
         logger.info("Pipeline completed successfully")
         return report
@@ -1072,38 +1673,45 @@ Examples:
     try:
         report = pipeline.run(args.input_file, args.output)
         
-        # Print summary to console
-        print("\n" + "="*60)
-        print("INTENT EXPANSION ANALYSIS SUMMARY")
-        print("="*60)
-        print(f"\nMessages Analyzed: {report['metadata']['total_messages_analyzed']}")
-        print(f"Themes Identified: {report['metadata']['themes_identified']}")
-        print(f"Proposals Generated: {report['metadata']['proposals_generated']}")
+        # Print summary to console, collected into a single write
+        metadata = report['metadata']
+        lines = [
+            "\n" + "="*60,
+            "INTENT EXPANSION ANALYSIS SUMMARY",
+            "="*60,
+            f"\nMessages Analyzed: {metadata['total_messages_analyzed']}",
+            f"Themes Identified: {metadata['themes_identified']}",
+            f"Proposals Generated: {metadata['proposals_generated']}",
+        ]
+        add = lines.append
         
         if report['proposed_intents']:
-            print("\nProposed New Intents:")
+            add("\nProposed New Intents:")
             for proposal in report['proposed_intents']:
-                print(f"  • {proposal['name']} (confidence: {proposal['confidence_score']})")
-                print(f"    └─ {proposal['description'][:80]}...")
-        
-        if report['guardrails']['warnings']:
-            print(f"\n⚠️  Guardrail Warnings: {len(report['guardrails']['warnings'])}")
-            for warning in report['guardrails']['warnings'][:3]:
-                print(f"  - {warning}")
-        
-        print(f"\nFull reports saved to:")
-        print(f"  - {args.output}.json")
-        print(f"  - {args.output}.md")
-        print("="*60)
+                add(f"  • {proposal['name']} (confidence: {proposal['confidence_score']})")
+                add(f"    └─ {proposal['description'][:80]}...")
+        
+        warnings = report['guardrails']['warnings']
+        if warnings:
+            add(f"\n⚠️  Guardrail Warnings: {len(warnings)}")
+            lines.extend(f"  - {warning}" for warning in warnings[:3])
+        
+        lines += [
+            "\nFull reports saved to:",
+            f"  - {args.output}.json",
+            f"  - {args.output}.md",
+            "="*60,
+        ]
+        sys.stdout.write("\n".join(lines) + "\n")
         
     except FileNotFoundError:
-        logger.error(f"Input file not found: {args.input_file}")
+        logger.error("Input file not found: %s", args.input_file)
         exit(1)
     except json.JSONDecodeError as e:
-        logger.error(f"Invalid JSON in input file: {e}")
+        logger.error("Invalid JSON in input file: %s", e)
         exit(1)
     except Exception as e:
-        logger.error(f"Pipeline failed: {e}")
+        logger.error("Pipeline failed: %s", e)
         if args.verbose:
             import traceback
             traceback.print_exc()